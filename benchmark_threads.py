@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+執行緒分配基準測試
+掃描不同的 STT / LLM 執行緒切分，量測單輪對話延遲 (語音辨識 + Ollama 回應)，
+並以未啟用 --low-power 的預設行為作為對照組
+"""
+
+import argparse
+import time
+from typing import List, Optional
+
+import httpx
+import numpy as np
+from faster_whisper import WhisperModel
+from rich.console import Console
+from rich.table import Table
+
+from resource_governor import detect_cores, find_ollama_pids, pin_process, plan_threads
+from wake_word import load_wav
+
+console = Console()
+
+OLLAMA_URL = "http://localhost:11434/api/generate"
+
+
+def load_audio(path: str, sample_rate: int = 16000) -> np.ndarray:
+    """讀取 16kHz 單聲道 wav，未指定檔案時產生 3 秒測試音"""
+    if not path:
+        t = np.linspace(0, 3.0, int(sample_rate * 3.0), endpoint=False)
+        return (0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+    return load_wav(path, sample_rate)
+
+
+def time_transcribe(stt: WhisperModel, audio_np: np.ndarray) -> float:
+    start = time.time()
+    segments, _ = stt.transcribe(audio_np, language=None, temperature=0.0,
+                                 condition_on_previous_text=False)
+    list(segments)  # segments 為 generator，需完整迭代才會實際運算
+    return time.time() - start
+
+
+def time_llm(model: str, prompt: str, num_thread: Optional[int]) -> float:
+    """num_thread 為 None 時不指定，使用 Ollama 預設值"""
+    options = {"num_predict": 32}
+    if num_thread is not None:
+        options["num_thread"] = num_thread
+    start = time.time()
+    response = httpx.post(OLLAMA_URL, json={
+        "model": model,
+        "prompt": prompt,
+        "stream": False,
+        "options": options,
+    }, timeout=300)
+    response.raise_for_status()
+    return time.time() - start
+
+
+def pin_all(stt_cores: List[int], llm_cores: List[int]):
+    pin_process(0, stt_cores)
+    for pid in find_ollama_pids():
+        pin_process(pid, llm_cores)
+
+
+def run_config(args, audio_np: np.ndarray, stt_threads: int, llm_threads: Optional[int],
+               stt_cores: List[int], llm_cores: List[int]):
+    """量測單一配置的平均 STT 與 LLM 延遲"""
+    # 先綁定本程序，CTranslate2 建立的執行緒會繼承親和性
+    pin_process(0, stt_cores)
+    stt = WhisperModel(args.whisper_model, device="cpu", compute_type="int8",
+                       cpu_threads=stt_threads, num_workers=1)
+    time_transcribe(stt, audio_np)  # 暖機
+
+    # num_thread 改變會讓 Ollama 重新載入模型並啟動新的 runner，
+    # 需先以相同設定暖機，再綁定新 runner 的所有執行緒，才開始計時
+    time_llm(args.ollama_model, args.prompt, llm_threads)
+    pin_all(stt_cores, llm_cores)
+
+    stt_times, llm_times = [], []
+    for _ in range(args.runs):
+        stt_times.append(time_transcribe(stt, audio_np))
+        llm_times.append(time_llm(args.ollama_model, args.prompt, llm_threads))
+    del stt
+    return float(np.mean(stt_times)), float(np.mean(llm_times))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="STT / LLM 執行緒分配基準測試")
+    parser.add_argument("--whisper-model", default="medium",
+                       choices=["tiny", "base", "small", "medium", "large"])
+    parser.add_argument("--ollama-model", default="qwen2.5:3b")
+    parser.add_argument("--audio", default="", help="16kHz wav 測試音檔 (預設: 合成測試音)")
+    parser.add_argument("--prompt", default="設定溫度22度")
+    parser.add_argument("--cpu-budget", type=int, default=0, help="測試的核心數 (預設: 全部)")
+    parser.add_argument("--runs", type=int, default=3, help="每組配置重複次數")
+    parser.add_argument("--no-pin", action="store_true", help="不綁定核心")
+    args = parser.parse_args()
+
+    audio_np = load_audio(args.audio)
+    original_cores = detect_cores()
+    budget = min(args.cpu_budget, len(original_cores)) if args.cpu_budget > 0 else len(original_cores)
+    console.print(f"[cyan]🧪 核心預算 {budget}，模型 {args.whisper_model} / {args.ollama_model}")
+
+    table = Table(title="執行緒分配 × 單輪延遲 (秒)")
+    for column in ["STT 執行緒", "LLM 執行緒", "STT", "LLM", "總延遲"]:
+        table.add_column(column, justify="right")
+
+    # 對照組：目前預設行為 (cpu_threads=0、不指定 num_thread、不綁定核心)
+    stt_avg, llm_avg = run_config(args, audio_np, 0, None, original_cores, original_cores)
+    baseline = stt_avg + llm_avg
+    table.add_row("自動 (預設)", "自動 (預設)", f"{stt_avg:.2f}", f"{llm_avg:.2f}", f"{baseline:.2f}")
+    console.print(f"[green]✅ 預設行為: {baseline:.2f}s")
+
+    results = []
+    for stt_threads in range(1, budget) if budget > 1 else [1]:
+        plan = plan_threads(budget, stt_threads / budget, original_cores)
+        stt_cores = original_cores if args.no_pin else plan.stt_cores
+        llm_cores = original_cores if args.no_pin else plan.llm_cores
+
+        stt_avg, llm_avg = run_config(args, audio_np, plan.stt_threads, plan.llm_threads,
+                                      stt_cores, llm_cores)
+        results.append((plan.stt_threads, plan.llm_threads, stt_avg + llm_avg))
+        table.add_row(str(plan.stt_threads), str(plan.llm_threads),
+                      f"{stt_avg:.2f}", f"{llm_avg:.2f}", f"{stt_avg + llm_avg:.2f}")
+        console.print(f"[green]✅ STT {plan.stt_threads} / LLM {plan.llm_threads}: {stt_avg + llm_avg:.2f}s")
+
+    pin_all(original_cores, original_cores)
+
+    console.print(table)
+    best = min(results, key=lambda r: r[2])
+    console.print(f"[bold green]🏁 最佳配置: STT {best[0]} / LLM {best[1]} 執行緒 "
+                  f"(--stt-share {best[0] / budget:.2f})，"
+                  f"相較預設行為 {baseline:.2f}s → {best[2]:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+喚醒詞閘門 CPU 量測
+以即時速度串流一段未喚醒的交談音訊，量測喚醒詞偵測的 CPU 時間，
+並可選擇量測同一段音訊原本會觸發的 Whisper 轉錄 CPU 時間作為對照
+"""
+
+import argparse
+import time
+
+import numpy as np
+from rich.console import Console
+
+from wake_word import (SAMPLE_RATE, DEFAULT_THRESHOLD, KeywordSpotter, WakeWordGate,
+                       load_templates, load_wav, mfcc, suggest_threshold)
+
+console = Console()
+
+BLOCK_SIZE = 1024  # 與 car_assistant.py 的 RawInputStream 相同
+
+
+def synthetic_chatter(duration: float, seed: int = 0) -> np.ndarray:
+    """產生交談模擬音訊：2 秒諧波語音段與 1 秒靜音交替"""
+    rng = np.random.default_rng(seed)
+    parts = []
+    while sum(len(p) for p in parts) < duration * SAMPLE_RATE:
+        t = np.arange(2 * SAMPLE_RATE) / SAMPLE_RATE
+        f0 = 120 + 80 * np.sin(2 * np.pi * rng.uniform(0.5, 3.0) * t)
+        phase = 2 * np.pi * np.cumsum(f0) / SAMPLE_RATE
+        voiced = sum(np.sin(k * phase) / k for k in range(1, 6)) * 0.1
+        parts.append(voiced.astype(np.float32))
+        parts.append((0.002 * rng.standard_normal(SAMPLE_RATE)).astype(np.float32))
+    return np.concatenate(parts)[:int(duration * SAMPLE_RATE)]
+
+
+def synthetic_templates():
+    """無模板目錄時，以上升掃頻音作為喚醒詞模板"""
+    templates = []
+    for speed in (0.9, 1.0, 1.1):
+        n = int(0.8 * speed * SAMPLE_RATE)
+        t = np.arange(n) / SAMPLE_RATE
+        sweep = 0.3 * np.sin(2 * np.pi * (300 + 1200 * t / (2 * t[-1])) * t)
+        templates.append(mfcc(sweep.astype(np.float32)))
+    return templates
+
+
+def main():
+    parser = argparse.ArgumentParser(description="喚醒詞閘門 CPU 量測")
+    parser.add_argument("--templates", default="", help="喚醒詞模板目錄 (預設: 合成模板)")
+    parser.add_argument("--audio", default="", help="16kHz 交談音檔 (預設: 合成音訊)")
+    parser.add_argument("--duration", type=float, default=10.0, help="合成音訊秒數")
+    parser.add_argument("--whisper-model", default="",
+                       help="指定時一併量測 Whisper 轉錄同段音訊的 CPU 時間")
+    args = parser.parse_args()
+
+    templates = load_templates(args.templates) if args.templates else synthetic_templates()
+    threshold = suggest_threshold(templates) or DEFAULT_THRESHOLD
+
+    audio_np = load_wav(args.audio) if args.audio else synthetic_chatter(args.duration)
+    audio_seconds = len(audio_np) / SAMPLE_RATE
+
+    gate = WakeWordGate(KeywordSpotter(templates, threshold))
+    console.print(f"[cyan]🧪 串流 {audio_seconds:.1f}s 音訊 (即時速度)...")
+    wakeups = 0
+    for i in range(0, len(audio_np) - BLOCK_SIZE + 1, BLOCK_SIZE):
+        block = audio_np[i:i + BLOCK_SIZE]
+        has_speech = np.sqrt(np.mean(block ** 2)) > 0.01
+        if gate.process(block, has_speech):
+            wakeups += 1
+            gate.close()
+        time.sleep(BLOCK_SIZE / SAMPLE_RATE)
+
+    spotter_cpu = gate.spotter.cpu_time
+    console.print(f"[green]喚醒詞偵測 CPU: {spotter_cpu:.3f}s / {audio_seconds:.1f}s 音訊 "
+                  f"({100 * spotter_cpu / audio_seconds:.2f}% 單核)，誤喚醒 {wakeups} 次")
+
+    if args.whisper_model:
+        from faster_whisper import WhisperModel
+        stt = WhisperModel(args.whisper_model, device="cpu", compute_type="int8")
+        start = time.process_time()
+        segments, _ = stt.transcribe(audio_np, language=None, temperature=0.0,
+                                     condition_on_previous_text=False)
+        list(segments)
+        # CTranslate2 在背景執行緒運算，此處需用程序層級 CPU 時間
+        whisper_cpu = time.process_time() - start
+        console.print(f"[green]Whisper {args.whisper_model} 轉錄 CPU: {whisper_cpu:.3f}s "
+                      f"(閘門每秒音訊省下約 {(whisper_cpu - spotter_cpu) / audio_seconds:.3f}s CPU，"
+                      f"尚未計入 LLM)")
+
+
+if __name__ == "__main__":
+    main()
@@ -17,6 +17,9 @@ from silero_vad import load_silero_vad, get_speech_timestamps
 import openai
 import os
 
+from resource_governor import ResourceGovernor
+from wake_word import SpeechGate, WakeWordGate, build_gate
+
 # 現代化的LangChain導入
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.runnables.history import RunnableWithMessageHistory
@@ -60,10 +63,13 @@ system_prompt = """你是RTK車載智慧助理，由瑞昱半導體研發。專
 console = Console()
 
 class CarVoiceAssistant:
-    def __init__(self, whisper_model="medium", ollama_model="qwen2.5:3b", use_openai=False):
+    def __init__(self, whisper_model="medium", ollama_model="qwen2.5:3b", use_openai=False,
+                 governor: ResourceGovernor = None, gate: SpeechGate = None):
         self.whisper_model = whisper_model
         self.ollama_model = ollama_model
         self.use_openai = use_openai
+        self.governor = governor  # 低功耗模式資源調度器，None 表示不限制
+        self.gate = gate  # 喚醒詞 / 按鍵通話閘門，None 表示任何語音皆觸發辨識
         self.stt = None  # faster-whisper 模型
         self.llm = None
         self.chain_with_history = None
@@ -102,6 +108,10 @@ class CarVoiceAssistant:
         """初始化所有組件 - 使用 faster-whisper"""
         console.print("[cyan]🚗 RTK車載智慧助理初始化中...")
         
+        if self.governor:
+            console.print(f"[cyan]⚙️ 低功耗模式: {self.governor.plan.describe()}")
+            self.governor.apply_pinning()
+        
         # 載入VAD模型
         console.print("[yellow]載入VAD語音活動檢測模型...")
         try:
@@ -116,16 +126,8 @@ class CarVoiceAssistant:
             console.print("[yellow]將使用fallback模式（無VAD）")
         
         # 載入 Faster-Whisper 模型
-        console.print(f"[yellow]載入 Faster-Whisper 模型: {self.whisper_model}")
         try:
-            self.stt = WhisperModel(
-                self.whisper_model,
-                device="cpu",
-                compute_type="int8",
-                cpu_threads=0,
-                num_workers=1
-            )
-            console.print("[green]✅ Faster-Whisper 載入成功")
+            self.load_whisper(self.whisper_model)
         except Exception as e:
             console.print(f"[red]❌ Faster-Whisper 載入失敗: {e}")
             raise
@@ -139,6 +141,35 @@ class CarVoiceAssistant:
         console.print("[green]✅ 智慧助理初始化完成")
         console.print("[cyan]🎤 系統背景監聽中...")
         
+    def load_whisper(self, model_name: str):
+        """載入 Faster-Whisper 模型，低功耗模式下限制 CTranslate2 執行緒數"""
+        console.print(f"[yellow]載入 Faster-Whisper 模型: {model_name}")
+        self.stt = WhisperModel(
+            model_name,
+            device="cpu",
+            compute_type="int8",
+            cpu_threads=self.governor.plan.stt_threads if self.governor else 0,
+            num_workers=1
+        )
+        self.whisper_model = model_name
+        console.print("[green]✅ Faster-Whisper 載入成功")
+    
+    def adapt_whisper_tier(self):
+        """重新綁定 Ollama 核心，並依熱與負載壓力切換 Whisper 模型等級"""
+        if not self.governor:
+            return
+        self.governor.repin_ollama()
+        new_tier = self.governor.next_tier()
+        if new_tier is None:
+            return
+        console.print(f"[yellow]🌡️ 系統壓力變化，Whisper 模型切換: {self.whisper_model} → {new_tier}")
+        previous = self.whisper_model
+        try:
+            self.load_whisper(new_tier)
+        except Exception as e:
+            console.print(f"[red]❌ 模型切換失敗，繼續使用 {previous}: {e}")
+            self.governor.current_tier = previous
+    
     async def test_ollama_connection(self):
         """測試Ollama服務連接"""
         try:
@@ -171,7 +202,10 @@ class CarVoiceAssistant:
         ])
         
         # 初始化LLM
-        self.llm = OllamaLLM(model=self.ollama_model, base_url="http://localhost:11434")
+        llm_options = {}
+        if self.governor:
+            llm_options["num_thread"] = self.governor.plan.llm_threads
+        self.llm = OllamaLLM(model=self.ollama_model, base_url="http://localhost:11434", **llm_options)
         
         # 創建對話鏈
         chain = prompt_template | self.llm
@@ -304,13 +338,16 @@ class CarVoiceAssistant:
         self.audio_buffer = []
         recording = False
         silence_start_time = None
+        gated = False                  # 目前語音段被閘門擋下
+        gated_start = None
+        gated_silence_start = None
         
         volume_threshold = 0.01        # 音量閾值
         silence_duration = 0.3         # 靜音持續時間（秒）
         min_recording_length = 1.2     # 最短錄音長度（秒）
         
         def audio_callback(indata, frames, time_info, status):
-            nonlocal recording, silence_start_time
+            nonlocal recording, silence_start_time, gated, gated_start, gated_silence_start
             
             if status:
                 console.print(f"[yellow]音訊狀態: {status}")
@@ -325,6 +362,25 @@ class CarVoiceAssistant:
             # 判斷是否有語音
             has_speech = volume > volume_threshold
             
+            # 語音閘門：未喚醒的語音不開始錄音，也不觸發 Whisper 與 LLM
+            if self.gate and not recording:
+                if not self.gate.process(audio_data, has_speech):
+                    if has_speech:
+                        if not gated:
+                            gated = True
+                            gated_start = current_time
+                        gated_silence_start = None
+                    elif gated:
+                        if gated_silence_start is None:
+                            gated_silence_start = current_time
+                        elif current_time - gated_silence_start >= silence_duration:
+                            # 與未啟用閘門時相同，短於 min_recording_length 的雜音本來就不會送辨識
+                            if current_time - gated_start >= min_recording_length:
+                                self.gate.gated_segments += 1
+                            gated = False
+                    return
+                gated = False
+            
             if has_speech:
                 # 檢測到語音
                 if not recording:
@@ -385,7 +441,12 @@ class CarVoiceAssistant:
 
         try:
             while True:
-                console.print("[blue]🔍 VAD 語音偵測中...")
+                if isinstance(self.gate, WakeWordGate):
+                    console.print("[blue]🔍 等待喚醒詞...")
+                elif self.gate:
+                    console.print("[blue]🔍 等待按鍵通話...")
+                else:
+                    console.print("[blue]🔍 VAD 語音偵測中...")
                 
                 # 開始連續語音監控
                 stop_event = threading.Event()
@@ -398,6 +459,8 @@ class CarVoiceAssistant:
                 
                 # 當VAD檢測到語音結束時，處理音訊
                 audio_np = np.array(self.audio_buffer)
+                if self.gate:
+                    self.gate.close()
                 
                 if len(audio_np) > 8000:  # 確保有足夠的音訊數據
                     # 語音轉文字
@@ -428,11 +491,17 @@ class CarVoiceAssistant:
                         console.print("[red]❌ 未能識別語音，請重試")
                 else:
                     console.print("[yellow]⚠️ 音訊太短，請再試一次")
+                
+                # 低功耗模式：回應顯示後、恢復監聽前再調整，模型重載不計入本輪延遲
+                self.adapt_whisper_tier()
                     
         except KeyboardInterrupt:
             console.print("\n[yellow]👋 正在關閉車載語音助理...")
         except Exception as e:
             console.print(f"[red]❌ 系統錯誤: {e}")
+        finally:
+            if self.gate:
+                console.print(f"[cyan]📊 語音閘門: {self.gate.summary()}")
 
 def main():
     """主程式入口"""
@@ -444,14 +513,58 @@ def main():
                        help="Ollama模型名稱 (預設: qwen2.5:3b)")
     parser.add_argument("--use-openai", action="store_true",
                        help="啟用OpenAI GPT-4o-mini作為第二個回應來源 (需設定 OPENAI_API_KEY 環境變數)")
+    parser.add_argument("--low-power", action="store_true",
+                       help="低功耗車機模式：分配執行緒、綁定核心並依熱/負載壓力調整 Whisper 模型")
+    parser.add_argument("--cpu-budget", type=int, default=0,
+                       help="低功耗模式可使用的核心數 (預設: 0，使用全部核心)")
+    parser.add_argument("--stt-share", type=float, default=0.5,
+                       help="語音辨識所佔核心比例，其餘給 Ollama (預設: 0.5)")
+    parser.add_argument("--no-pin", action="store_true",
+                       help="低功耗模式下不綁定核心")
+    parser.add_argument("--no-adaptive-tier", action="store_true",
+                       help="低功耗模式下不自動切換 Whisper 模型等級")
+    parser.add_argument("--gate", default="none", choices=["none", "wake", "ptt"],
+                       help="語音閘門：none 任何語音皆觸發，wake 喚醒詞，ptt 按鍵通話 (預設: none)")
+    parser.add_argument("--wake-templates", default="wake_templates",
+                       help="喚醒詞模板目錄 (以 python wake_word.py --enroll 錄製)")
+    parser.add_argument("--wake-threshold", type=float, default=None,
+                       help="喚醒詞 DTW 距離閾值 (預設: 依模板自動計算)")
+    parser.add_argument("--ptt-file", default=None,
+                       help="按鍵通話訊號檔，存在時視為按下 (預設: 終端機按 Enter)")
+    parser.add_argument("--listen-window", type=float, default=5.0,
+                       help="喚醒或按鍵後等待指令的秒數 (預設: 5.0)")
     
     args = parser.parse_args()
     
+    governor = None
+    if args.low_power:
+        governor = ResourceGovernor(
+            whisper_model=args.whisper_model,
+            budget=args.cpu_budget,
+            stt_share=args.stt_share,
+            pin_cores=not args.no_pin,
+            adaptive_tier=not args.no_adaptive_tier
+        )
+    
+    try:
+        gate = build_gate(
+            args.gate,
+            template_dir=args.wake_templates,
+            threshold=args.wake_threshold,
+            signal_file=args.ptt_file,
+            listen_window=args.listen_window
+        )
+    except ValueError as e:
+        console.print(f"[red]❌ {e}")
+        return
+    
     # 創建車載助理實例
     assistant = CarVoiceAssistant(
         whisper_model=args.whisper_model,
         ollama_model=args.ollama_model,
-        use_openai=args.use_openai
+        use_openai=args.use_openai,
+        governor=governor,
+        gate=gate
     )
     
     async def run():
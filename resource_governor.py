@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+資源調度器 (Resource Governor) - 低功耗車機 CPU 模式
+依核心數與可用預算分配 CTranslate2 (faster-whisper)、ONNX VAD 與 Ollama 的執行緒，
+將語音處理與 LLM 綁定到不同核心，並在過熱或高負載時自動降級 Whisper 模型。
+"""
+
+import os
+import glob
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from rich.console import Console
+
+console = Console()
+
+# Whisper 模型由大到小排列，壓力過大時往後降級
+WHISPER_TIERS = ["large", "medium", "small", "base", "tiny"]
+
+
+@dataclass
+class ThreadPlan:
+    """執行緒與核心分配結果"""
+    total_cores: int
+    budget: int
+    stt_threads: int
+    vad_threads: int
+    llm_threads: int
+    stt_cores: List[int] = field(default_factory=list)
+    llm_cores: List[int] = field(default_factory=list)
+
+    def describe(self) -> str:
+        return (f"核心 {self.budget}/{self.total_cores} | "
+                f"STT {self.stt_threads} 執行緒 {self.stt_cores} | "
+                f"VAD {self.vad_threads} 執行緒 | "
+                f"LLM {self.llm_threads} 執行緒 {self.llm_cores}")
+
+
+def detect_cores() -> List[int]:
+    """偵測本程序可使用的 CPU 核心編號"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def plan_threads(budget: int = 0, stt_share: float = 0.5, cores: Optional[List[int]] = None) -> ThreadPlan:
+    """依核心預算切分執行緒
+
+    budget 為 0 表示使用所有偵測到的核心；stt_share 為語音辨識所佔比例。
+    VAD 固定 1 執行緒並與 STT 共用核心（兩者不會同時運算），其餘核心給 Ollama。
+    """
+    available = cores if cores is not None else detect_cores()
+    total = len(available)
+    budget = total if budget <= 0 else min(budget, total)
+    usable = available[:budget]
+
+    if budget == 1:
+        # 單核心無法分離，全部共用
+        return ThreadPlan(total, budget, 1, 1, 1, usable, usable)
+
+    stt_threads = min(max(1, round(budget * stt_share)), budget - 1)
+    llm_threads = budget - stt_threads
+    return ThreadPlan(
+        total_cores=total,
+        budget=budget,
+        stt_threads=stt_threads,
+        vad_threads=1,
+        llm_threads=llm_threads,
+        stt_cores=usable[:stt_threads],
+        llm_cores=usable[stt_threads:],
+    )
+
+
+def find_ollama_pids() -> List[int]:
+    """尋找 Ollama 服務與 runner 程序 (僅支援 Linux /proc)"""
+    pids = []
+    for comm_path in glob.glob("/proc/[0-9]*/comm"):
+        try:
+            with open(comm_path) as f:
+                name = f.read().strip()
+        except OSError:
+            continue
+        if name.startswith("ollama"):
+            pids.append(int(comm_path.split("/")[2]))
+    return pids
+
+
+def pin_process(pid: int, cores: List[int]) -> bool:
+    """將程序的所有執行緒綁定到指定核心 (等同 taskset -a)，平台不支援或權限不足時回傳 False
+
+    Linux 的 sched_setaffinity 只作用於 TID 等於 pid 的單一執行緒，
+    Ollama 的 Go runtime 與 llama.cpp 運算執行緒必須逐一綁定。
+    pid 為 0 表示本程序；程序已結束時回傳 False。
+    """
+    if not cores or not hasattr(os, "sched_setaffinity"):
+        return False
+    if pid == 0:
+        pid = os.getpid()
+    try:
+        tids = [int(tid) for tid in os.listdir(f"/proc/{pid}/task")]
+    except OSError:
+        return False  # 程序已結束 (例如 keep_alive 到期或切換模型)
+    pinned = False
+    for tid in tids:
+        try:
+            os.sched_setaffinity(tid, cores)
+            pinned = True
+        except ProcessLookupError:
+            continue  # 執行緒已結束
+        except OSError:
+            return False
+    return pinned
+
+
+def read_cpu_temperature() -> Optional[float]:
+    """讀取最高的 thermal zone 溫度 (攝氏)，無資料時回傳 None"""
+    temps = []
+    for path in glob.glob("/sys/class/thermal/thermal_zone*/temp"):
+        try:
+            with open(path) as f:
+                temps.append(int(f.read().strip()) / 1000.0)
+        except (OSError, ValueError):
+            continue
+    return max(temps) if temps else None
+
+
+def read_load_ratio() -> Optional[float]:
+    """一分鐘平均負載除以核心數"""
+    if not hasattr(os, "getloadavg"):
+        return None
+    return os.getloadavg()[0] / (os.cpu_count() or 1)
+
+
+class ResourceGovernor:
+    """依熱與負載壓力調整執行緒配置與 Whisper 模型等級"""
+
+    def __init__(self, whisper_model="medium", budget=0, stt_share=0.5, pin_cores=True,
+                 adaptive_tier=True, temp_high=80.0, temp_low=70.0,
+                 load_high=1.2, load_low=0.7, check_interval=10.0, switch_cooldown=60.0):
+        self.plan = plan_threads(budget, stt_share)
+        self.pin_cores = pin_cores
+        self.adaptive_tier = adaptive_tier
+        self.preferred_tier = whisper_model
+        self.current_tier = whisper_model
+        self.temp_high = temp_high
+        self.temp_low = temp_low
+        self.load_high = load_high
+        self.load_low = load_low
+        self.check_interval = check_interval
+        # 切換後至少等待一分鐘負載平均的視窗，模型重載本身的負載與溫度才不會觸發連續切換
+        self.switch_cooldown = switch_cooldown
+        self._last_check = 0.0
+        self._last_switch = 0.0
+        self._seen_ollama_pids = set()
+
+    def apply_pinning(self):
+        """將本程序 (STT + VAD) 與 Ollama 綁定到不同核心"""
+        if not self.pin_cores:
+            return
+        if pin_process(0, self.plan.stt_cores):
+            console.print(f"[green]✅ 語音處理綁定核心 {self.plan.stt_cores}")
+        else:
+            console.print("[yellow]⚠️ 此平台不支援核心綁定，僅套用執行緒數")
+            self.pin_cores = False
+            return
+        self.repin_ollama()
+
+    def repin_ollama(self):
+        """重新綁定所有 Ollama 程序的執行緒
+
+        Ollama runner 於首次 LLM 呼叫時才啟動，且新增的執行緒需一併綁定，
+        因此每輪對話後都需呼叫，不受模型等級調整設定影響。
+        """
+        if not self.pin_cores:
+            return
+        for pid in find_ollama_pids():
+            pinned = pin_process(pid, self.plan.llm_cores)
+            if not pinned and not os.path.isdir(f"/proc/{pid}"):
+                continue  # 程序已結束，不是權限問題
+            if pid in self._seen_ollama_pids:
+                continue
+            self._seen_ollama_pids.add(pid)
+            if pinned:
+                console.print(f"[green]✅ Ollama 綁定核心 {self.plan.llm_cores} (PID: {pid})")
+            else:
+                console.print(f"[yellow]⚠️ 無法綁定 Ollama 程序 PID {pid} (權限不足)")
+
+    def under_pressure(self) -> bool:
+        temp = read_cpu_temperature()
+        load = read_load_ratio()
+        return (temp is not None and temp >= self.temp_high) or \
+               (load is not None and load >= self.load_high)
+
+    def relieved(self) -> bool:
+        temp = read_cpu_temperature()
+        load = read_load_ratio()
+        return (temp is None or temp <= self.temp_low) and \
+               (load is None or load <= self.load_low)
+
+    def next_tier(self) -> Optional[str]:
+        """檢查壓力，需要切換模型時回傳新的 Whisper 等級，否則回傳 None
+
+        過熱或過載時降一級；恢復到低水位後逐級升回使用者指定的等級。
+        每次切換後需經過 switch_cooldown 秒才會再次切換。
+        """
+        if not self.adaptive_tier:
+            return None
+        now = time.time()
+        if now - self._last_check < self.check_interval or now - self._last_switch < self.switch_cooldown:
+            return None
+        self._last_check = now
+
+        if self.current_tier not in WHISPER_TIERS:
+            return None
+        index = WHISPER_TIERS.index(self.current_tier)
+        preferred = WHISPER_TIERS.index(self.preferred_tier) if self.preferred_tier in WHISPER_TIERS else index
+
+        if index < len(WHISPER_TIERS) - 1 and self.under_pressure():
+            self.current_tier = WHISPER_TIERS[index + 1]
+        elif index > preferred and self.relieved():
+            self.current_tier = WHISPER_TIERS[index - 1]
+        else:
+            return None
+        self._last_switch = now
+        return self.current_tier
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+語音閘門 (Speech Gate) - 喚醒詞 / 按鍵通話
+只有被喚醒的語音才會送進 Whisper 與 LLM，避免乘客交談觸發辨識與誤指令。
+喚醒詞以 MFCC + DTW 模板比對實作，僅需 numpy，不需額外模型。
+"""
+
+import argparse
+import glob
+import os
+import sys
+import threading
+import time
+from typing import List, Optional
+
+import numpy as np
+from rich.console import Console
+
+console = Console()
+
+SAMPLE_RATE = 16000
+FRAME_LENGTH = 400   # 25ms
+HOP_LENGTH = 320     # 20ms
+N_FFT = 512
+N_MELS = 26
+N_MFCC = 13
+
+DEFAULT_THRESHOLD = 0.3   # 僅有單一模板時使用
+MIN_THRESHOLD = 0.15      # 模板過於相似時的下限，避免實際語速變化無法觸發
+
+
+def _mel_filterbank(sample_rate: int = SAMPLE_RATE, n_fft: int = N_FFT, n_mels: int = N_MELS) -> np.ndarray:
+    def hz_to_mel(hz):
+        return 2595.0 * np.log10(1.0 + hz / 700.0)
+
+    def mel_to_hz(mel):
+        return 700.0 * (10 ** (mel / 2595.0) - 1.0)
+
+    mel_points = np.linspace(hz_to_mel(80.0), hz_to_mel(sample_rate / 2), n_mels + 2)
+    bins = np.floor((n_fft + 1) * mel_to_hz(mel_points) / sample_rate).astype(int)
+    fbank = np.zeros((n_mels, n_fft // 2 + 1), dtype=np.float32)
+    for m in range(1, n_mels + 1):
+        left, center, right = bins[m - 1], bins[m], bins[m + 1]
+        for k in range(left, center):
+            fbank[m - 1, k] = (k - left) / max(center - left, 1)
+        for k in range(center, right):
+            fbank[m - 1, k] = (right - k) / max(right - center, 1)
+    return fbank
+
+
+def _dct_matrix(n_in: int = N_MELS, n_out: int = N_MFCC) -> np.ndarray:
+    n = np.arange(n_in)
+    k = np.arange(n_out)[:, None]
+    return np.cos(np.pi / n_in * (n + 0.5) * k).astype(np.float32)
+
+
+_FBANK = _mel_filterbank()
+_DCT = _dct_matrix()
+_WINDOW = np.hamming(FRAME_LENGTH).astype(np.float32)
+
+
+def mfcc(audio_np: np.ndarray) -> np.ndarray:
+    """計算 MFCC 特徵 (frames × N_MFCC)，未做倒頻譜均值正規化 (見 cepstral_mean)"""
+    if len(audio_np) < FRAME_LENGTH:
+        return np.zeros((0, N_MFCC), dtype=np.float32)
+    n_frames = 1 + (len(audio_np) - FRAME_LENGTH) // HOP_LENGTH
+    idx = np.arange(FRAME_LENGTH)[None, :] + HOP_LENGTH * np.arange(n_frames)[:, None]
+    frames = audio_np[idx] * _WINDOW
+    power = np.abs(np.fft.rfft(frames, N_FFT)) ** 2
+    log_mel = np.log(power @ _FBANK.T + 1e-10)
+    return log_mel @ _DCT.T
+
+
+def cepstral_mean(templates: List[np.ndarray]) -> np.ndarray:
+    """以所有模板幀計算固定的倒頻譜均值
+
+    模板與串流 query 都減去同一個均值，避免 query 以整個緩衝區 (含前後交談或靜音)
+    計算均值而與模板的正規化基準不同，使自動閾值與實際比對距離不一致。
+    """
+    return np.concatenate(templates).mean(axis=0)
+
+
+def load_wav(path: str, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """讀取 wav 為 float32 單聲道，取樣率不符時拋出 ValueError"""
+    from scipy.io import wavfile
+
+    rate, data = wavfile.read(path)
+    if rate != sample_rate:
+        raise ValueError(f"{path} 取樣率需為 {sample_rate}Hz (目前 {rate}Hz)")
+    if data.dtype == np.int16:
+        data = data.astype(np.float32) / 32768.0
+    elif data.dtype == np.int32:
+        data = data.astype(np.float32) / 2147483648.0
+    data = data.astype(np.float32)
+    if data.ndim > 1:
+        data = data.mean(axis=1)
+    return data
+
+
+def trim_silence(audio_np: np.ndarray, threshold: float = 0.01) -> np.ndarray:
+    """去除前後靜音 (以 20ms 區塊 RMS 判斷)"""
+    n_blocks = len(audio_np) // HOP_LENGTH
+    if n_blocks == 0:
+        return audio_np
+    blocks = audio_np[:n_blocks * HOP_LENGTH].reshape(n_blocks, HOP_LENGTH)
+    voiced = np.where(np.sqrt(np.mean(blocks ** 2, axis=1)) > threshold)[0]
+    if len(voiced) == 0:
+        return audio_np[:0]
+    return audio_np[voiced[0] * HOP_LENGTH:(voiced[-1] + 1) * HOP_LENGTH]
+
+
+def dtw_distance(template: np.ndarray, query: np.ndarray) -> float:
+    """子序列 DTW：模板可從 query 任意位置開始並結束
+
+    步進限制為 (1,1)、(1,2)、(2,1) (模板幀, query 幀)，斜率介於 0.5 與 2 之間，
+    對應的 query 長度約為模板的 0.5 到 2 倍，模板無法被壓縮到幾幀的短促聲音上。
+    (2,1) 步進會計入跳過的模板幀成本，每個模板幀恰好計一次，
+    因此以模板長度正規化。距離為逐幀 cosine 距離。
+    """
+    if len(template) == 0 or len(query) == 0:
+        return float("inf")
+    t = template / (np.linalg.norm(template, axis=1, keepdims=True) + 1e-10)
+    q = query / (np.linalg.norm(query, axis=1, keepdims=True) + 1e-10)
+    cost = 1.0 - t @ q.T
+
+    # 第 -1 列為 0：路徑可從 query 任意位置開始
+    prev2 = np.zeros(len(q))
+    prev = cost[0].copy()
+    for i in range(1, len(t)):
+        best = np.full(len(q), np.inf)
+        best[1:] = prev[:-1]                                        # (1,1)
+        best[2:] = np.minimum(best[2:], prev[:-2])                  # (1,2)
+        best[1:] = np.minimum(best[1:], prev2[:-1] + cost[i - 1, 1:])  # (2,1)
+        if i == 1:
+            best[0] = cost[0, 0]                                    # 由第 -1 列以 (2,1) 起始
+        prev2, prev = prev, cost[i] + best
+    return float(prev.min() / len(t))
+
+
+def load_templates(template_dir: str) -> List[np.ndarray]:
+    """載入喚醒詞模板 wav (16kHz 單聲道)"""
+    templates = []
+    for path in sorted(glob.glob(os.path.join(template_dir, "*.wav"))):
+        try:
+            data = load_wav(path)
+        except ValueError as e:
+            console.print(f"[yellow]⚠️ 略過 {e}")
+            continue
+        features = mfcc(trim_silence(data))
+        if len(features) > 0:
+            templates.append(features)
+    return templates
+
+
+def suggest_threshold(templates: List[np.ndarray], margin: float = 1.5) -> Optional[float]:
+    """以模板之間的最大距離乘上餘裕作為預設閾值，模板少於兩個時回傳 None
+
+    模板以與 KeywordSpotter 相同的固定倒頻譜均值正規化，閾值與串流比對使用同一基準。
+    """
+    if len(templates) < 2:
+        return None
+    mean = cepstral_mean(templates)
+    templates = [t - mean for t in templates]
+    distances = [dtw_distance(a, b) for i, a in enumerate(templates) for b in templates[i + 1:]]
+    return max(max(distances) * margin, MIN_THRESHOLD)
+
+
+class KeywordSpotter:
+    """串流喚醒詞偵測：保留最近的音訊，有語音時定期與模板比對
+
+    語音轉為靜音的第一個區塊一定會比對，確保喚醒詞結尾不會因比對間隔被截斷。
+    """
+
+    def __init__(self, templates: List[np.ndarray], threshold: float, score_interval: float = 0.2):
+        if not templates:
+            raise ValueError("至少需要一個喚醒詞模板")
+        self.mean = cepstral_mean(templates)
+        self.templates = [t - self.mean for t in templates]
+        self.threshold = threshold
+        self.score_interval = score_interval
+        longest = max(len(t) for t in templates)
+        # 保留最長模板兩倍長度的音訊，對應 DTW 斜率限制允許的最慢語速
+        self.buffer_size = (2 * longest + 1) * HOP_LENGTH + FRAME_LENGTH
+        self.buffer = np.zeros(0, dtype=np.float32)
+        self._last_score = 0.0
+        self._prev_speech = False
+        self.cpu_time = 0.0
+
+    def reset(self):
+        self.buffer = np.zeros(0, dtype=np.float32)
+        self._prev_speech = False
+
+    def feed(self, audio_data: np.ndarray, has_speech: bool) -> bool:
+        """送入一段音訊，偵測到喚醒詞時回傳 True"""
+        self.buffer = np.concatenate([self.buffer, audio_data])[-self.buffer_size:]
+        speech_ended = self._prev_speech and not has_speech
+        self._prev_speech = has_speech
+        now = time.time()
+        if not speech_ended and (not has_speech or now - self._last_score < self.score_interval):
+            return False
+        self._last_score = now
+
+        # thread_time 只計算音訊 callback 執行緒，不含 Whisper / LLM 等其他執行緒
+        start = time.thread_time()
+        features = mfcc(self.buffer) - self.mean
+        score = min(dtw_distance(t, features) for t in self.templates)
+        self.cpu_time += time.thread_time() - start
+
+        if score <= self.threshold:
+            console.print(f"[magenta]🔔 喚醒詞偵測 (距離: {score:.3f})")
+            self.reset()
+            return True
+        return False
+
+
+class SpeechGate:
+    """語音閘門基底：決定一段語音是否為對助理說話"""
+
+    def __init__(self, listen_window: float = 5.0):
+        self.listen_window = listen_window
+        self.open_until = 0.0
+        self.gated_segments = 0
+
+    def open(self):
+        self.open_until = time.time() + self.listen_window
+
+    def close(self):
+        """一次指令送出後關閉閘門，下一個指令需重新喚醒"""
+        self.open_until = 0.0
+
+    def is_open(self) -> bool:
+        return time.time() < self.open_until
+
+    def process(self, audio_data: np.ndarray, has_speech: bool) -> bool:
+        """送入一段音訊，回傳是否允許開始錄音"""
+        return self.is_open()
+
+    def summary(self) -> str:
+        return f"略過 {self.gated_segments} 段未喚醒語音 (每段原本都會觸發一次 Whisper + LLM 呼叫)"
+
+
+class WakeWordGate(SpeechGate):
+    """喚醒詞閘門：偵測到喚醒詞後，在 listen_window 秒內接受指令"""
+
+    def __init__(self, spotter: KeywordSpotter, listen_window: float = 5.0):
+        super().__init__(listen_window)
+        self.spotter = spotter
+
+    def process(self, audio_data: np.ndarray, has_speech: bool) -> bool:
+        if self.is_open():
+            return True
+        if self.spotter.feed(audio_data, has_speech):
+            self.open()
+        return False
+
+    def summary(self) -> str:
+        return f"{super().summary()}，喚醒詞偵測 CPU 時間 {self.spotter.cpu_time:.2f}s"
+
+
+class PushToTalkGate(SpeechGate):
+    """按鍵通話閘門
+
+    signal_file 存在時視為按鍵按下 (供方向盤按鍵 / CAN 服務建立與刪除)；
+    未指定時在終端機按 Enter 開啟 listen_window 秒的收音。
+    """
+
+    def __init__(self, signal_file: Optional[str] = None, listen_window: float = 5.0):
+        super().__init__(listen_window)
+        self.signal_file = signal_file
+        if signal_file is None:
+            threading.Thread(target=self._wait_for_enter, daemon=True).start()
+
+    def _wait_for_enter(self):
+        for _ in sys.stdin:
+            console.print("[magenta]🔘 按鍵通話：請說出指令")
+            self.open()
+
+    def is_open(self) -> bool:
+        if self.signal_file is not None and os.path.exists(self.signal_file):
+            return True
+        return super().is_open()
+
+
+def build_gate(mode: str, template_dir: str = "wake_templates", threshold: Optional[float] = None,
+               signal_file: Optional[str] = None, listen_window: float = 5.0) -> Optional[SpeechGate]:
+    """依模式建立語音閘門，mode 為 none 時回傳 None"""
+    if mode == "none":
+        return None
+    if mode == "ptt":
+        return PushToTalkGate(signal_file, listen_window)
+
+    templates = load_templates(template_dir)
+    if not templates:
+        raise ValueError(f"{template_dir} 中沒有喚醒詞模板，請先執行: python wake_word.py --enroll {template_dir}")
+    if threshold is None:
+        threshold = suggest_threshold(templates) or DEFAULT_THRESHOLD
+    console.print(f"[green]✅ 載入 {len(templates)} 個喚醒詞模板 (閾值: {threshold:.3f})")
+    return WakeWordGate(KeywordSpotter(templates, threshold), listen_window)
+
+
+def enroll(template_dir: str, samples: int = 3, duration: float = 2.0):
+    """錄製喚醒詞模板"""
+    import sounddevice as sd
+    from scipy.io import wavfile
+
+    os.makedirs(template_dir, exist_ok=True)
+    for i in range(samples):
+        input(f"按 Enter 後請說出喚醒詞 ({i + 1}/{samples})...")
+        audio = sd.rec(int(duration * SAMPLE_RATE), samplerate=SAMPLE_RATE, channels=1, dtype="int16")
+        sd.wait()
+        path = os.path.join(template_dir, f"wake_{int(time.time())}_{i}.wav")
+        wavfile.write(path, SAMPLE_RATE, audio[:, 0])
+        console.print(f"[green]✅ 已儲存 {path}")
+
+    threshold = suggest_threshold(load_templates(template_dir))
+    if threshold is not None:
+        console.print(f"[cyan]建議閾值: {threshold:.3f} (可用 --wake-threshold 調整)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="喚醒詞模板錄製")
+    parser.add_argument("--enroll", default="wake_templates", help="模板儲存目錄")
+    parser.add_argument("--samples", type=int, default=3, help="錄製次數")
+    parser.add_argument("--duration", type=float, default=2.0, help="每次錄音秒數")
+    args = parser.parse_args()
+    enroll(args.enroll, args.samples, args.duration)